@@ -0,0 +1,110 @@
+# fixtures.py
+"""
+Inputs for the microbenchmarks: a captured-style detstatus reply, HV data
+files of realistic size, and a dummy curses screen.
+
+The programs under test import wexpect, epics and curses at module level;
+load_modules() puts the harness stand-ins in front of the first two and
+gives display.py a curses whose color_pair() works without a terminal.
+"""
+import datetime
+import os
+import sys
+import types
+from collections import deque
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'harness'))
+
+import fake_epics
+import fake_ups
+import fake_wexpect
+from fake_hv_writer import FakeHVWriter
+
+ROWS_PER_DAY = 17280    # one HV row every 5 s
+
+DETSTATUS_OUTPUT = 'detstatus -all\r\n' + fake_ups.render_detstatus({})
+
+
+class DummyScreen:
+    """The subset of a curses window display.py draws on, doing nothing."""
+
+    def __init__(self, height=50, width=250):
+        self.size = (height, width)
+
+    def getmaxyx(self):
+        return self.size
+
+    def clear(self):
+        pass
+
+    def addstr(self, *args):
+        pass
+
+    def refresh(self):
+        pass
+
+
+def _dummy_curses():
+    import curses
+    dummy = types.ModuleType('curses')
+    dummy.__dict__.update({k: v for k, v in vars(curses).items() if k.startswith(('A_', 'COLOR_'))})
+    dummy.color_pair = lambda n: n << 8
+    return dummy
+
+
+def load_modules():
+    """Import the modules under test; returns a namespace of them."""
+    sys.modules.setdefault('wexpect', fake_wexpect)
+    sys.modules.setdefault('epics', fake_epics)
+    sys.path.insert(0, REPO_DIR)
+    sys.path.insert(0, os.path.join(REPO_DIR, 'curses_version'))
+
+    import HV_IOCscript
+    import acquisition
+    import data_parser
+    import display
+    import monitor
+    display.curses = _dummy_curses()
+    return types.SimpleNamespace(HV_IOCscript=HV_IOCscript, acquisition=acquisition,
+                                 data_parser=data_parser, display=display, monitor=monitor)
+
+
+def write_hv_day(directory, rows=ROWS_PER_DAY):
+    """Write one day's HV data file and return its path."""
+    writer = FakeHVWriter(directory)
+    writer.sim_start = datetime.datetime(2026, 1, 1)
+    path = writer.filename_for(writer.sim_start)
+    with open(path, 'w') as f:
+        for seq in range(rows):
+            f.write(writer.format_row(seq, writer.sim_start + datetime.timedelta(seconds=5 * seq)))
+    return path
+
+
+def make_hv_directory(directory, nfiles):
+    """nfiles small dated .txt files, as find_latest_file sees after nfiles days."""
+    day = datetime.date(2026, 1, 1)
+    for i in range(nfiles):
+        with open(os.path.join(directory, f'{day + datetime.timedelta(days=i):%Y%m%d}.txt'), 'w') as f:
+            f.write('0\n')
+
+
+def stat_params():
+    return {
+        "voltage":          "121.4",
+        "net_status":       "Online",
+        "freq":             "60.0",
+        "battery_charge":   "100.0",
+        "alarm_counter":    0,
+        "rampdown_trigger": False,
+    }
+
+
+def log_lines(screen, fill=True):
+    """A full log pane for screen, as monitor() keeps it."""
+    maxlen = screen.size[0] - 7     # display.resize: height - MENU_HEIGHT - 1
+    lines = deque(maxlen=maxlen)
+    for _ in range(maxlen if fill else 0):
+        lines.append('12:00:00\tOnline\t\t121.4\t\t100.0\t\t\t(0/3)\t\tIdle')
+    return lines
@@ -0,0 +1,225 @@
+# run_bench.py
+"""
+Microbenchmarks for the per-sample hot paths, with a regression gate.
+
+Each case is timed with timeit in short runs, taken in rounds across all
+cases so a slow patch of the machine hits every case alike; the best of
+--repeat rounds is compared. Results go to a JSON file and are compared
+against a stored baseline; any case slower than the baseline by more than
+its threshold, or with no baseline entry, fails the run.
+
+    python bench/run_bench.py --save-baseline       # once per machine, first
+    python bench/run_bench.py                       # compare to bench/baseline.json
+    python bench/run_bench.py -k find_latest --threshold find_latest_file=0.5
+
+Baselines are per machine, so none is committed: record one on the node the
+numbers matter for before the first comparison, and again with -k for any
+case added since. Without one the run fails rather than passing unchecked.
+Between runs of unchanged code the best-of-rounds figure moved by 0.90x to
+1.10x on the development machine, well inside the default threshold.
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import timeit
+
+import fixtures
+
+DEFAULT_BASELINE = os.path.join(fixtures.BENCH_DIR, 'baseline.json')
+DEFAULT_THRESHOLD = 0.25    # allowed slowdown, as a fraction of the baseline
+
+
+def case_parse_detstatus(mods, tmp, stack):
+    output = fixtures.DETSTATUS_OUTPUT
+    return lambda: mods.data_parser.parse_detstatus(output)
+
+
+def case_adaptive_polling(mods, tmp, stack):
+    polling = mods.acquisition.AdaptivePolling()
+    return lambda: polling.update("121.4", "60.0", "Acceptable", None)
+
+
+def case_buf_count_newlines(mods, tmp, stack):
+    path = fixtures.write_hv_day(tmp)
+    return lambda: mods.HV_IOCscript.buf_count_newlines_gen(path)
+
+
+def case_hv_tail_read(mods, tmp, stack):
+    hv_f = stack.enter_context(open(fixtures.write_hv_day(tmp), 'r'))
+    return lambda: mods.HV_IOCscript.read_last_line(hv_f)
+
+
+def _find_latest_file(nfiles):
+    def case(mods, tmp, stack):
+        fixtures.make_hv_directory(tmp, nfiles)     # run_cases times it from tmp
+        return mods.HV_IOCscript.find_latest_file
+    return case
+
+
+def case_display_render(mods, tmp, stack):
+    screen = fixtures.DummyScreen()
+    lines = fixtures.log_lines(screen)
+    mods.display.render(screen, True, lines, 0)    # settle previous_size
+    return lambda: mods.display.render(screen, True, lines, 0)
+
+
+def case_display_update(mods, tmp, stack):
+    screen = fixtures.DummyScreen()
+    lines = fixtures.log_lines(screen)
+    params = fixtures.stat_params()
+    return lambda: mods.display.update(screen, params, lines)
+
+
+def case_monitor_log_line(mods, tmp, stack):
+    now = datetime.datetime(2026, 1, 1, 12, 0, 0)
+    return lambda: mods.monitor.format_log_line(now, "121.4", "60.0", "100.0")
+
+
+def case_monitor_console_line(mods, tmp, stack):
+    now = datetime.datetime(2026, 1, 1, 12, 0, 0)
+    params = fixtures.stat_params()
+    return lambda: mods.monitor.format_console_line(now, params)
+
+
+CASES = {
+    "parse_detstatus":        case_parse_detstatus,
+    "adaptive_polling":       case_adaptive_polling,
+    "buf_count_newlines":     case_buf_count_newlines,
+    "hv_tail_read":           case_hv_tail_read,
+    "find_latest_file_10":    _find_latest_file(10),
+    "find_latest_file_100":   _find_latest_file(100),
+    "find_latest_file_1000":  _find_latest_file(1000),
+    "display_render":         case_display_render,
+    "display_update":         case_display_update,
+    "monitor_log_line":       case_monitor_log_line,
+    "monitor_console_line":   case_monitor_console_line,
+}
+
+
+def autorange(timer, min_time):
+    loops = 1
+    while timer.timeit(loops) < min_time:
+        loops *= 10 if loops < 1000 else 2
+    return loops
+
+
+def run_cases(names, repeat, min_time):
+    mods = fixtures.load_modules()
+    cwd = os.getcwd()
+    timers = {}
+    runs = {name: [] for name in names}
+    with contextlib.ExitStack() as cleanup:
+        try:
+            for name in names:
+                tmp = cleanup.enter_context(tempfile.TemporaryDirectory(prefix='icarus_bench_'))
+                # entered after tmp, so whatever the case opened is closed before tmp goes away
+                stack = cleanup.enter_context(contextlib.ExitStack())
+                timer = timeit.Timer(CASES[name](mods, tmp, stack))
+                os.chdir(tmp)
+                timers[name] = (tmp, timer, autorange(timer, min_time))
+            for _ in range(repeat):
+                for name, (tmp, timer, loops) in timers.items():
+                    os.chdir(tmp)
+                    runs[name].append(timer.timeit(loops) / loops)
+        finally:
+            os.chdir(cwd)
+
+    results = {}
+    for name, (tmp, timer, loops) in timers.items():
+        times = sorted(runs[name])
+        results[name] = {"best_s": times[0], "median_s": times[len(times) // 2],
+                         "loops": loops, "repeat": repeat}
+        print(f'  {name:<24} {times[0] * 1e6:12.3f} us')
+    return results
+
+
+def compare(results, baseline, thresholds):
+    """
+    Return (name, ratio, threshold) for every case over its threshold;
+    ratio is None for a case the baseline has no entry for.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            regressions.append((name, None, None))
+            continue
+        ratio = result["best_s"] / baseline[name]["best_s"]
+        threshold = thresholds.get(name, thresholds.get('*', DEFAULT_THRESHOLD))
+        if ratio > 1 + threshold:
+            regressions.append((name, ratio, threshold))
+    return regressions
+
+
+def parse_threshold(text):
+    name, _, value = text.rpartition('=')
+    return (name or '*', float(value))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', dest='select', default='',
+                        help='only run cases whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=25, help='timing rounds over all cases (default: 25)')
+    parser.add_argument('--min-time', type=float, default=0.02,
+                        help='seconds each timing run lasts at least (default: 0.02)')
+    parser.add_argument('--output', default='bench_output.json', help='where to write results')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline results to compare with')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store these results as the baseline instead of comparing')
+    parser.add_argument('--threshold', type=parse_threshold, action='append', default=[],
+                        metavar='[CASE=]FRACTION',
+                        help=f'allowed slowdown, globally or per case (default: {DEFAULT_THRESHOLD})')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = [name for name in CASES if args.select in name]
+    print(f'bench: {len(names)} cases on Python {platform.python_version()}')
+    results = run_cases(names, args.repeat, args.min_time)
+    record = {
+        "python":   platform.python_version(),
+        "machine":  platform.node(),
+        "date":     datetime.datetime.now().isoformat(timespec='seconds'),
+        "cases":    results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(record, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)["cases"]
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(dict(record, cases=baseline), f, indent=2)
+        print(f'bench: baseline saved to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'FAIL no baseline at {args.baseline}; record one with --save-baseline')
+        return 1
+    with open(args.baseline) as f:
+        baseline = json.load(f)["cases"]
+    regressions = compare(results, baseline, dict(args.threshold))
+    for name in results:
+        if name in baseline:
+            print(f'  {name:<24} {results[name]["best_s"] / baseline[name]["best_s"]:6.2f}x baseline')
+    for name, ratio, threshold in regressions:
+        if ratio is None:
+            print(f'FAIL {name}: not in the baseline; record it with -k {name} --save-baseline')
+        else:
+            print(f'FAIL {name}: {ratio:.2f}x baseline (limit {1 + threshold:.2f}x)')
+    print('PASS' if not regressions else 'FAILED')
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
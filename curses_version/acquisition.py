@@ -0,0 +1,99 @@
+# acquisition.py
+# UPS readout and alarm logic shared by the curses monitor and the headless
+# daemon. Nothing here may import curses.
+from decimal import Decimal
+
+import ssh_connector
+import data_parser
+import config
+
+AC_INPUT_LOST = 'ac_input_lost'
+ALARM_THRESHOLD_REACHED = 'alarm_threshold'
+
+def read_status(ssh_session):
+    ssh_connector.ensure_prompt(ssh_session)
+    output = ssh_connector.execute_command(ssh_session, config.SSH_DETSTATUS_CMD)
+    return data_parser.parse_detstatus(output)
+
+def input_lost(in_voltage_str):
+    return Decimal(in_voltage_str) < 1
+
+def check_alarm(in_voltage_str, alarm_counter):
+    """
+    Advance the alarm counter for one reading.
+    Returns (alarm_counter, rampdown_trigger, event) where event is
+    AC_INPUT_LOST, ALARM_THRESHOLD_REACHED or None.
+    """
+    rampdown_trigger = False
+    # uncomment below to send the ramp down trigger to EPICS
+    #ups_acinput_status.put(int(rampdown_trigger))
+    if input_lost(in_voltage_str) and alarm_counter < config.ALARM_THRESHOLD:
+        alarm_counter += 1
+        return alarm_counter, rampdown_trigger, AC_INPUT_LOST
+    elif alarm_counter == config.ALARM_THRESHOLD:
+        # uncomment below to send ramp down trigger to slow control program to activate the emergency ramp down feature
+        #ups_status_file = open("upsstatus.afd", "w")
+        #ups_status_file.write("1\n")
+        #ups_status_file.close()
+        #rampdown_trigger = True
+        #ups_acinput_status.put(int(rampdown_trigger))
+        return alarm_counter, rampdown_trigger, ALARM_THRESHOLD_REACHED
+    return 0, rampdown_trigger, None
+
+class AdaptivePolling:
+    """
+    Picks the polling interval from the latest reading. Polls at the slow
+    rate only after POLLING_CALM_SAMPLES nominal readings in a row; any
+    drop or jump of the input voltage, off-nominal frequency, change of
+    input status or a reading that raised the alarm counter switches to the
+    fast rate at once. It goes by the readings, not the counter: the counter
+    latches at ALARM_THRESHOLD and would keep polling fast after recovery.
+    The fast rate never waits less than the (smoothed) detstatus round trip,
+    so the management card is busy at most half the time.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget the history (e.g. after losing the session) and poll fast."""
+        self.calm = 0
+        self.last_voltage = None
+        self.last_status = None
+        self.round_trip = None
+        self.interval = config.POLLING_INTERVAL_FAST
+
+    def is_nominal(self, voltage, freq, input_status, alarm_event):
+        return (alarm_event != AC_INPUT_LOST
+                and config.NOMINAL_VOLTAGE_MIN <= voltage <= config.NOMINAL_VOLTAGE_MAX
+                and (self.last_voltage is None or abs(voltage - self.last_voltage) <= config.NOMINAL_VOLTAGE_STEP)
+                and abs(freq - config.NOMINAL_FREQ) <= Decimal(str(config.NOMINAL_FREQ_TOLERANCE))
+                and (self.last_status is None or input_status == self.last_status))
+
+    def fast_interval(self):
+        if self.round_trip is None:
+            return config.POLLING_INTERVAL_FAST
+        return max(config.POLLING_INTERVAL_FAST, int(self.round_trip))
+
+    def update(self, in_voltage_str, in_freq_str, input_status, alarm_event, round_trip_ms=None):
+        """
+        Feed one reading, the event check_alarm() gave for it and how long
+        it took to fetch (ms); returns the interval to wait in miliseconds.
+        """
+        if round_trip_ms is not None:
+            if self.round_trip is None:
+                self.round_trip = round_trip_ms
+            else:
+                self.round_trip = 0.8 * self.round_trip + 0.2 * round_trip_ms
+        voltage = Decimal(in_voltage_str)
+        if self.is_nominal(voltage, Decimal(in_freq_str), input_status, alarm_event):
+            self.calm += 1
+        else:
+            self.calm = 0
+        self.last_voltage = voltage
+        self.last_status = input_status
+
+        if self.calm >= config.POLLING_CALM_SAMPLES:
+            self.interval = config.POLLING_INTERVAL_SLOW
+        else:
+            self.interval = self.fast_interval()
+        return self.interval
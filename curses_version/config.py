@@ -7,6 +7,21 @@ SSH_DETSTATUS_CMD = 'detstatus -all'
 SSH_CONNECT_RETRIES = 30
 SSH_CONNECT_DELAY = 10
 SSH_EXPECT_TIMEOUT = 15
-POLLING_INTERVAL = 900  # in miliseconds
+ERROR_RETRY_DELAY = 2  # in seconds, after a failed readout before reconnecting
+POLLING_INTERVAL = 900  # in miliseconds, screen refresh while monitoring is paused
+POLLING_INTERVAL_FAST = 300  # in miliseconds, whenever the UPS input is not nominal; never below the measured detstatus round trip
+POLLING_INTERVAL_SLOW = 2000  # in miliseconds, while input power is nominal and stable
+POLLING_CALM_SAMPLES = 20  # nominal samples in a row before slowing down again
+NOMINAL_VOLTAGE_MIN = 108  # VAC
+NOMINAL_VOLTAGE_MAX = 132  # VAC
+NOMINAL_VOLTAGE_STEP = 3  # largest VAC change between samples still counted as stable
+NOMINAL_FREQ = 60  # Hz
+NOMINAL_FREQ_TOLERANCE = 0.5  # Hz
 MENU_HEIGHT = 6  # 메뉴와 상태 메시지 차지하는 줄 수
 ALARM_THRESHOLD = 3
+DAEMON_LOG_PREFIX = 'upsstatus_v4'  # headless records go to <prefix>_YYYYMMDD.jsonl
+DAEMON_FLUSH_INTERVAL = 10  # in seconds
+DAEMON_MAX_RECONNECT_DELAY = 300  # in seconds
+# The daemon cannot ping the systemd watchdog while blocked in expect: up to
+# 2 x SSH_EXPECT_TIMEOUT in a readout and 4 x SSH_EXPECT_TIMEOUT (60 s) while
+# connecting. WatchdogSec in the unit file must be well above that, e.g. 90.
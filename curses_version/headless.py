@@ -0,0 +1,201 @@
+# headless.py
+# UPS monitor loop without a terminal. Runs the same acquisition and alarm
+# logic as monitor.py, writes JSON-lines records, talks to the systemd
+# notify socket (READY/WATCHDOG/STOPPING) when there is one, and shuts down
+# cleanly on SIGTERM or SIGINT.
+import datetime
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+import ssh_connector
+import acquisition
+import config
+
+def sd_notify(state):
+    """
+    Send a state string to $NOTIFY_SOCKET. Returns False when not running
+    under systemd (or any other notify-aware supervisor).
+    """
+    address = os.environ.get('NOTIFY_SOCKET')
+    if not address:
+        return False
+    if address[0] == '@':
+        address = '\0' + address[1:]
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.connect(address)
+            sock.sendall(state.encode())
+        return True
+    except OSError:
+        return False
+
+class Watchdog:
+    def __init__(self):
+        usec = int(os.environ.get('WATCHDOG_USEC', 0))
+        pid = os.environ.get('WATCHDOG_PID')
+        if pid and int(pid) != os.getpid():
+            usec = 0
+        # ping at half the watchdog period, as sd_watchdog_enabled(3) advises
+        self.interval = usec / 2e6
+        self.last_ping = 0.0
+
+    def ping(self):
+        now = time.monotonic()
+        if self.interval and now - self.last_ping >= self.interval:
+            sd_notify('WATCHDOG=1')
+            self.last_ping = now
+
+    def wait(self, stop, seconds):
+        """stop.wait(seconds) that keeps the watchdog fed while it waits."""
+        deadline = time.monotonic() + seconds
+        while not stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self.ping()
+            if self.interval:
+                remaining = min(remaining, self.last_ping + self.interval - time.monotonic())
+            stop.wait(max(remaining, 0))
+        return stop.is_set()
+
+class RecordWriter:
+    """
+    Buffered JSON-lines log, one file per day. Records are held in memory
+    and written out every flush_interval seconds, or at once when urgent.
+    """
+    def __init__(self, prefix=config.DAEMON_LOG_PREFIX, flush_interval=config.DAEMON_FLUSH_INTERVAL):
+        self.prefix = prefix
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.today_tag = None
+        self.last_flush = time.monotonic()
+
+    def write(self, record, urgent=False):
+        today_tag = datetime.date.today().strftime('%Y%m%d')
+        if today_tag != self.today_tag:
+            self.flush()    # yesterday's records stay in yesterday's file
+            self.today_tag = today_tag
+        self.buffer.append(json.dumps(record))
+        if urgent or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            with open(f"{self.prefix}_{self.today_tag}.jsonl", "a") as flog:
+                flog.write('\n'.join(self.buffer) + '\n')
+            self.buffer = []
+        self.last_flush = time.monotonic()
+
+def make_record(event, **fields):
+    record = {"time": datetime.datetime.now().isoformat(timespec='milliseconds'), "event": event}
+    record.update(fields)
+    return record
+
+def connect(stop, watchdog, writer):
+    """
+    Open an SSH session, backing off between attempts without ever blocking
+    shutdown or the watchdog. Returns None when asked to stop.
+    """
+    attempt = 0
+    while not stop.is_set():
+        attempt += 1
+        try:
+            return ssh_connector.create_ssh_session(
+                        config.SSH_HOSTNAME,
+                        config.SSH_USERNAME,
+                        config.SSH_PASSWORD,
+                        retries=1,
+                        base_delay=0
+                    )
+        except RuntimeError as e:
+            delay = min(config.SSH_CONNECT_DELAY * (2 ** (attempt - 1)), config.DAEMON_MAX_RECONNECT_DELAY)
+            writer.write(make_record("connect_failed", attempt=attempt, error=str(e), retry_in=delay), urgent=True)
+            watchdog.wait(stop, delay)
+    return None
+
+def run():
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    writer = RecordWriter()
+    watchdog = Watchdog()
+    alarm_counter = 0
+    last_alarm = (None, 0)
+    polling = acquisition.AdaptivePolling()
+    ssh_session = None
+
+    writer.write(make_record("start", host=config.SSH_HOSTNAME, polling_interval_ms=polling.interval), urgent=True)
+    sd_notify('READY=1')
+
+    try:
+        while not stop.is_set():
+            watchdog.ping()
+
+            if not ssh_connector.is_session_alive(ssh_session):
+                ssh_session = connect(stop, watchdog, writer)
+                continue
+
+            try:
+                round_trip_start = time.monotonic()
+                parsed = acquisition.read_status(ssh_session)
+                round_trip_ms = (time.monotonic() - round_trip_start) * 1000
+                in_voltage_str = parsed["in_voltage"] or "0"
+                in_freq_str = parsed["in_freq"] or "0"
+                alarm_counter, rampdown_trigger, alarm_event = acquisition.check_alarm(in_voltage_str, alarm_counter)
+                previous_interval = polling.interval
+                polling.update(in_voltage_str, in_freq_str, parsed["input_status"], alarm_event, round_trip_ms)
+
+                writer.write(make_record(
+                        "sample",
+                        voltage=in_voltage_str,
+                        freq=in_freq_str,
+                        battery_charge=parsed["batt_soc"] or "0",
+                        ups_online=parsed["ups_online"],
+                        input_status=parsed["input_status"],
+                        alarm=alarm_event,
+                        alarm_counter=alarm_counter,
+                        alarm_threshold=config.ALARM_THRESHOLD,
+                        rampdown_trigger=rampdown_trigger,
+                        polling_interval_ms=polling.interval
+                    ), urgent=acquisition.input_lost(in_voltage_str)
+                              or (alarm_event is not None and (alarm_event, alarm_counter) != last_alarm)
+                              or polling.interval < previous_interval)
+                # the threshold alarm latches; the input itself tells a new power loss
+                last_alarm = (alarm_event, alarm_counter)
+
+            except Exception as e:
+                if stop.is_set():
+                    break   # SIGTERM while blocked in expect, not a failed readout
+                print(f'[ERR] Unexpected error: {e}', file=sys.stderr)
+                writer.write(make_record("error", error=f'{type(e).__name__}: {e}'), urgent=True)
+                # Try a safe reconnect
+                try:
+                    ssh_session.close()
+                except Exception:
+                    pass
+                ssh_session = None
+                polling.reset()
+                watchdog.wait(stop, config.ERROR_RETRY_DELAY)
+                continue
+
+            watchdog.wait(stop, polling.interval/1000)
+    finally:
+        sd_notify('STOPPING=1')
+        if ssh_connector.is_session_alive(ssh_session):
+            try:
+                ssh_session.sendline('exit')
+                ssh_session.close()
+            except Exception:
+                pass
+        writer.write(make_record("stop"))
+        writer.flush()
@@ -5,20 +5,33 @@ import time
 import datetime
 import wexpect
 import sys
-from decimal import Decimal
 
 import ssh_connector
-import data_parser
+import acquisition
 import display
 import handle
 import config
 
+def format_console_line(now, stat_params):
+    return (f'[UPS {now:%m/%d/%Y %H:%M:%S}] '
+            f'Network: {"Online" if stat_params["net_status"] else "Offline"} '
+            f'ACinput: {stat_params["voltage"]} VAC '
+            f'Battery: {stat_params["battery_charge"]} %'
+            f'Alarm counter: {stat_params["alarm_counter"]} '
+            f'Ramp down trigger: {"Triggered" if stat_params["rampdown_trigger"] else "Idle"}'
+            )
+
+def format_log_line(now, in_voltage_str, in_freq_str, batt_soc):
+    return f"{in_voltage_str} VAC @ {in_freq_str} Hz\t {batt_soc} %% {now:%m/%d/%Y}\t{now:%H:%M:%S}\n"
+
 def monitor(stdscr):
     display.init_display(stdscr)
 
     running = False
     lines = deque()
     alarm_counter = 0
+    polling = acquisition.AdaptivePolling()
+    next_sample = time.monotonic()
     last_update = time.time()
 
     ssh_session = ssh_connector.create_ssh_session(
@@ -43,36 +56,26 @@ def monitor(stdscr):
                             config.SSH_USERNAME,
                             config.SSH_PASSWORD
                         )
-            if running:
+            if running and time.monotonic() >= next_sample:
                 try:
-                    ssh_connector.ensure_prompt(ssh_session)
-                    output = ssh_connector.execute_command(ssh_session, config.SSH_DETSTATUS_CMD)
-
-                    parsed = data_parser.parse_detstatus(output)
+                    round_trip_start = time.monotonic()
+                    parsed = acquisition.read_status(ssh_session)
+                    round_trip_ms = (time.monotonic() - round_trip_start) * 1000
                     in_voltage_str = parsed["in_voltage"] or "0"
                     in_freq_str = parsed["in_freq"] or "0"
                     batt_soc = parsed["batt_soc"] or "0"
 
                     # determine ramp down status
-                    voltage = Decimal(in_voltage_str)
-                    rampdown_trigger = False
-                    # uncomment below to send the ramp down trigger to EPICS
-                    #ups_acinput_status.put(int(rampdown_trigger))
-                    if voltage < 1 and alarm_counter < 3:
+                    alarm_counter, rampdown_trigger, alarm_event = acquisition.check_alarm(in_voltage_str, alarm_counter)
+                    if alarm_event == acquisition.AC_INPUT_LOST:
                         print(f'Ramp Down Trigger {rampdown_trigger}')
-                        alarm_counter += 1
                         print(f'Warning! No ACinput power. Current alarm counter is ({alarm_counter}/{config.ALARM_THRESHOLD})')
-                    elif alarm_counter == 3:
+                    elif alarm_event == acquisition.ALARM_THRESHOLD_REACHED:
                         print(f'Alarm counter reached the threshold ({alarm_counter}/{config.ALARM_THRESHOLD}.')
                         print("Sending EMERGENCY Ramp Down Signal NOW!")
-                        # uncomment below to send ramp down trigger to slow control program to activate the emergency ramp down feature
-                        #ups_status_file = open("upsstatus.afd", "w")
-                        #ups_status_file.write("1\n")
-                        #ups_status_file.close()
-                        #rampdown_trigger = True
-                        #ups_acinput_status.put(int(rampdown_trigger))
-                    else:
-                        alarm_counter = 0
+
+                    # poll faster while the input power is anything but nominal
+                    polling.update(in_voltage_str, in_freq_str, parsed["input_status"], alarm_event, round_trip_ms)
 
                     stat_params = {
                             "voltage": in_voltage_str,
@@ -87,19 +90,13 @@ def monitor(stdscr):
                     display.update(stdscr, stat_params, lines)
 
                     # console log
-                    print(f'[UPS {now:%m/%d/%Y %H:%M:%S}] '
-                          f'Network: {"Online" if stat_params['net_status'] else "Offline"} '
-                          f'ACinput: {stat_params['voltage']} VAC '
-                          f'Battery: {stat_params['battery_charge']} %'
-                          f'Alarm counter: {alarm_counter} '
-                          f'Ramp down trigger: {"Triggered" if rampdown_trigger else "Idle"}'
-                          )
+                    print(format_console_line(now, stat_params))
 
                     # file log
                     with open(f"upsstatus_v4_{today_tag}.txt", "a") as flog:
-                        flog.write(f"{in_voltage_str} VAC @ {in_freq_str} Hz\t {batt_soc} %% {now:%m/%d/%Y}\t{now:%H:%M:%S}\n")
+                        flog.write(format_log_line(now, in_voltage_str, in_freq_str, batt_soc))
 
-                    time.sleep(config.POLLING_INTERVAL/1000)
+                    next_sample = time.monotonic() + polling.interval/1000
 
                 except KeyboardInterrupt:
                     print('Stopping monitoring (Ctrl-C).')
@@ -110,7 +107,7 @@ def monitor(stdscr):
                 except Exception as e:
                     print(f'[ERR] Unexpected error: {e}', file=sys.stderr)
                     with open(f"upsstatus_v4_{today_tag}.err", "a") as flog:
-                        flot.write(f"[ERR] {now:%d/%m/%Y %H:%M:%S} : Unexpected error occurred.")
+                        flog.write(f"[ERR] {now:%d/%m/%Y %H:%M:%S} : Unexpected error occurred.")
                     
                     # Try a safe reconnect
                     try:
@@ -118,11 +115,17 @@ def monitor(stdscr):
                     except Exception:
                         pass
                     ssh_session = None
-                    time.sleep(2)
+                    polling.reset()
+                    next_sample = time.monotonic() + config.ERROR_RETRY_DELAY
 
 
             stdscr.refresh()
 
+            # wait for the next sample in getch, so keys are handled at once
+            if running:
+                stdscr.timeout(max(0, int((next_sample - time.monotonic()) * 1000)))
+            else:
+                stdscr.timeout(config.POLLING_INTERVAL)
             running, should_quit = handle.handle_user_input(stdscr, running)
 
             if should_quit:
@@ -0,0 +1,11 @@
+# ups_daemon.py
+# Headless entry point: no curses, no terminal needed.
+# Under systemd use Type=notify with WatchdogSec above the longest stretch
+# without a ping, 4 x SSH_EXPECT_TIMEOUT (60 s) while connecting; e.g. 90.
+import headless
+
+def main():
+    headless.run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# fake_epics.py
+"""
+Local stand-in for pyepics' PV.
+
+Every put() is appended as a JSON line {"t", "pv", "value"} to the file named
+in $HARNESS_PV_LOG so the harness can see what would have reached the IOC.
+"""
+import json
+import os
+import time
+
+_log = None
+
+
+def _pv_log():
+    global _log
+    if _log is None:
+        path = os.environ.get('HARNESS_PV_LOG')
+        _log = open(path, 'a', buffering=1) if path else open(os.devnull, 'w')
+    return _log
+
+
+class PV:
+
+    def __init__(self, pvname, **kwargs):
+        self.pvname = pvname
+        self.value = None
+        self.connected = True
+
+    def put(self, value, wait=False, timeout=30.0, **kwargs):
+        self.value = value
+        _pv_log().write(json.dumps({"t": time.time(), "pv": self.pvname, "value": value}) + '\n')
+        return 1
+
+    def get(self, **kwargs):
+        return self.value
+
+    def wait_for_connection(self, timeout=None):
+        return True
@@ -0,0 +1,85 @@
+# fake_hv_writer.py
+"""
+Stand-in for the HV DAQ that writes one dated .txt file per day.
+
+Rows are appended on a simulated clock running `speed` times faster than
+real time, so day rollover (a new file) happens as often as the soak run
+needs. The I_set column carries a sequence number so each value published
+by HV_IOCscript.py can be matched back to the row it came from.
+"""
+import datetime
+import os
+import random
+import threading
+import time
+
+
+class FakeHVWriter(threading.Thread):
+    """
+    period is the simulated time between rows in seconds. sim_start is the
+    simulated datetime of the first row; by default two minutes before the
+    next midnight so the first rollover happens early in the run.
+    """
+
+    def __init__(self, directory, speed=100.0, period=5.0, sim_start=None):
+        super().__init__(daemon=True)
+        self.directory = directory
+        self.speed = speed
+        self.period = period
+        if sim_start is None:
+            tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+            sim_start = datetime.datetime.combine(tomorrow, datetime.time()) - datetime.timedelta(minutes=2)
+        self.sim_start = sim_start
+        self.seq = 0
+        self.files = 0
+        self.lock = threading.Lock()
+        self.write_times = {}   # seq -> time.time() the row hit the file
+        self.stopping = threading.Event()
+        self._filename = None
+
+    def filename_for(self, sim_now):
+        return os.path.join(self.directory, f'{sim_now:%Y%m%d}.txt')
+
+    def format_row(self, seq, sim_now):
+        vmon = 75000 + random.randint(-20, 20)
+        imon = 2100 + random.randint(-5, 5)
+        return (f'{sim_now.timestamp():.3f}\t{sim_now:%H:%M:%S}\t'
+                f'{vmon}\t{imon}\t'
+                f'{vmon // 4}\t{vmon // 4}\t{vmon // 4}\t{vmon // 4}\t'
+                f'75000\t{seq}\t{sim_now:%m/%d/%Y}\n')
+
+    def write_row(self):
+        sim_now = self.sim_start + datetime.timedelta(seconds=self.seq * self.period)
+        filename = self.filename_for(sim_now)
+        row = self.format_row(self.seq, sim_now)
+        if filename != self._filename:
+            # Create the new day's file with its first row already in it;
+            # the IOC script would otherwise catch it empty.
+            tmp = filename + '.part'
+            with open(tmp, 'w') as f:
+                f.write(row)
+            os.rename(tmp, filename)
+            self._filename = filename
+            self.files += 1
+        else:
+            with open(filename, 'a') as f:
+                f.write(row)
+        with self.lock:
+            self.write_times[self.seq] = time.time()
+        self.seq += 1
+
+    def run(self):
+        interval = self.period / self.speed
+        next_due = time.monotonic()
+        while not self.stopping.is_set():
+            self.write_row()
+            next_due += interval
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                self.stopping.wait(delay)
+            else:
+                next_due = time.monotonic()     # fell behind; don't burst
+
+    def stop(self):
+        self.stopping.set()
+        self.join()
@@ -0,0 +1,201 @@
+# fake_ups.py
+"""
+A local stand-in for the APC UPS management card.
+
+Speaks just enough of the `apc>` command line for ssh_connector and the
+monitor loop: a prompt, `detstatus -all` answered from a scripted list of
+readings, and `exit`. Latency and dropped connections can be injected so the
+reconnect paths get exercised too.
+"""
+import json
+import random
+import socketserver
+import threading
+import time
+
+PROMPT = 'apc>'
+
+DETSTATUS_TEMPLATE = (
+    'E000: Success\r\n'
+    'Status of UPS: {ups_status}\r\n'
+    'Last Transfer: {last_transfer}\r\n'
+    'Input Status: {input_status}\r\n'
+    'Next Battery Replacement Date: 01/15/2027\r\n'
+    'Battery State Of Charge: {batt_soc} %\r\n'
+    'Output Voltage: {out_voltage} VAC\r\n'
+    'Output Frequency: {out_freq} Hz\r\n'
+    'Output Watts Percent: 12.0 %\r\n'
+    'Output VA Percent: 13.0 %\r\n'
+    'Output Current: 2.10 A\r\n'
+    'Output Efficiency: 93.0 %\r\n'
+    'Output Energy: 1234.56 kWh\r\n'
+    'Input Voltage: {in_voltage} VAC\r\n'
+    'Input Frequency: {in_freq} Hz\r\n'
+    'Battery Voltage: 54.6 VDC\r\n'
+    'Battery Temperature: 25.0 C, 77.0 F\r\n'
+)
+
+NOMINAL = {
+    "ups_status":    "Online",
+    "last_transfer": "Automatic",
+    "input_status":  "Acceptable",
+    "batt_soc":      "100.0",
+    "out_voltage":   "120.0",
+    "out_freq":      "60.0",
+    "in_voltage":    "121.4",
+    "in_freq":       "60.0",
+}
+
+# Built-in scripts: lists of (repeat, overrides) steps, cycled forever.
+SCRIPTS = {
+    "nominal": [
+        (1, {}),
+    ],
+    "outage": [
+        (50, {}),
+        (6,  {"in_voltage": "0.0", "in_freq": "0.0", "input_status": "Blackout",
+              "ups_status": "On", "last_transfer": "Blackout", "batt_soc": "97.0"}),
+        (20, {"batt_soc": "97.0"}),
+    ],
+    "brownout": [
+        (30, {}),
+        (10, {"in_voltage": "98.2", "input_status": "Brownout"}),
+        (30, {}),
+    ],
+}
+
+
+def load_script(name_or_path):
+    """
+    Return a list of (repeat, overrides) steps, either a built-in script name
+    or a JSON file holding [{"repeat": n, "in_voltage": "0.0", ...}, ...].
+    """
+    if name_or_path in SCRIPTS:
+        return SCRIPTS[name_or_path]
+    with open(name_or_path) as f:
+        steps = json.load(f)
+    return [(int(s.pop("repeat", 1)), s) for s in steps]
+
+
+def render_detstatus(overrides):
+    fields = dict(NOMINAL)
+    fields.update(overrides)
+    return DETSTATUS_TEMPLATE.format(**fields)
+
+
+class Stats:
+    """Counters shared between the connection handlers and the harness."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.dropped = 0
+        self.served = 0
+        self.sent_times = []    # time each detstatus reply went out
+
+    def take_sent_times(self):
+        with self.lock:
+            times, self.sent_times = self.sent_times, []
+        return times
+
+
+class _Handler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        server = self.server
+        with server.stats.lock:
+            server.stats.connections += 1
+        sock = self.request
+        buf = b''
+        try:
+            sock.sendall(f'\r\nAmerican Power Conversion\r\n{PROMPT} '.encode())
+            while not server.stopping.is_set():
+                data = sock.recv(4096)
+                if not data:
+                    return
+                buf += data
+                while b'\n' in buf:
+                    line, buf = buf.split(b'\n', 1)
+                    cmd = line.decode(errors='replace').strip()
+                    if not self.dispatch(sock, cmd):
+                        return
+        except OSError:
+            return
+
+    def dispatch(self, sock, cmd):
+        server = self.server
+        if cmd == 'exit':
+            sock.sendall(b'Bye.\r\n')
+            return False
+        if cmd == '':
+            sock.sendall(f'\r\n{PROMPT} '.encode())
+            return True
+        if cmd != 'detstatus -all':
+            sock.sendall(f'{cmd}\r\nE101: Command Not Found\r\n{PROMPT} '.encode())
+            return True
+
+        if server.holding.is_set():
+            server.stopping.wait()      # shutting down: leave the request unanswered
+            return False
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay:
+            time.sleep(delay)
+        if server.drop_rate and random.random() < server.drop_rate:
+            with server.stats.lock:
+                server.stats.dropped += 1
+            sock.sendall(f'{cmd}\r\nE000: Succ'.encode())   # cut off mid-reply
+            return False
+
+        reply = f'{cmd}\r\n{render_detstatus(server.next_reading())}{PROMPT} '.encode()
+        with server.stats.lock:
+            server.stats.served += 1
+            server.stats.sent_times.append(time.monotonic())
+        sock.sendall(reply)
+        return True
+
+
+class FakeUPSServer(socketserver.ThreadingTCPServer):
+    """
+    TCP server on localhost answering the UPS command line.
+
+    latency and jitter are in seconds; drop_rate is the probability that a
+    `detstatus -all` request gets its connection closed mid-reply.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, script="nominal", latency=0.0, jitter=0.0, drop_rate=0.0,
+                 address=('127.0.0.1', 0)):
+        super().__init__(address, _Handler)
+        self.steps = load_script(script)
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.stats = Stats()
+        self.stopping = threading.Event()
+        self.holding = threading.Event()
+        self._step = 0
+        self._left = self.steps[0][0]
+        self._reading_lock = threading.Lock()
+
+    def next_reading(self):
+        with self._reading_lock:
+            if self._left == 0:
+                self._step = (self._step + 1) % len(self.steps)
+                self._left = self.steps[self._step][0]
+            self._left -= 1
+            return self.steps[self._step][1]
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self.server_address
+
+    def hold(self):
+        """Stop answering detstatus so in-flight samples can be accounted."""
+        self.holding.set()
+
+    def stop(self):
+        self.stopping.set()
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,118 @@
+# fake_wexpect.py
+"""
+Socket-backed stand-in for the parts of wexpect the monitor uses.
+
+spawn() ignores the ssh command line and connects to the fake UPS whose
+address is in $HARNESS_UPS_ADDR ("host:port"), so ssh_connector runs
+unchanged against fake_ups.py.
+"""
+import os
+import re
+import socket
+import time
+import types
+
+
+class ExceptionPexpect(Exception):
+    pass
+
+
+class EOF(ExceptionPexpect):
+    pass
+
+
+class TIMEOUT(ExceptionPexpect):
+    pass
+
+
+# ups_monitor scripts refer to wexpect.wexpect_util.EOF / TIMEOUT
+wexpect_util = types.SimpleNamespace(EOF=EOF, TIMEOUT=TIMEOUT,
+                                     ExceptionPexpect=ExceptionPexpect)
+
+
+class SpawnSocket:
+
+    def __init__(self, command, maxread=65535, timeout=30, address=None):
+        if address is None:
+            host, port = os.environ['HARNESS_UPS_ADDR'].rsplit(':', 1)
+            address = (host, int(port))
+        self.command = command
+        self.maxread = maxread
+        self.timeout = timeout
+        self.before = ''
+        self.after = ''
+        self.match = None
+        self.closed = False
+        self._buffer = ''
+        self._eof = False
+        try:
+            self._sock = socket.create_connection(address, timeout=timeout)
+        except OSError as e:
+            self.closed = True
+            raise EOF(f'connect to {address} failed: {e}')
+
+    def isalive(self):
+        return not self.closed and not self._eof
+
+    def sendline(self, s=''):
+        if self.closed:
+            raise EOF('session is closed')
+        try:
+            self._sock.sendall((s + '\r\n').encode())
+        except OSError as e:
+            self._eof = True
+            raise EOF(str(e))
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._sock.close()
+
+    def expect(self, pattern, timeout=-1):
+        if timeout == -1:
+            timeout = self.timeout
+        patterns = pattern if isinstance(pattern, list) else [pattern]
+        regexes = [(i, re.compile(p)) for i, p in enumerate(patterns) if isinstance(p, str)]
+        deadline = time.monotonic() + timeout
+
+        while True:
+            best = None
+            for i, rx in regexes:
+                m = rx.search(self._buffer)
+                if m and (best is None or m.start() < best[1].start()):
+                    best = (i, m)
+            if best is not None:
+                i, m = best
+                self.before = self._buffer[:m.start()]
+                self.after = m.group(0)
+                self.match = m
+                self._buffer = self._buffer[m.end():]
+                return i
+
+            if self._eof:
+                return self._unmatched(patterns, EOF, 'EOF from fake UPS')
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return self._unmatched(patterns, TIMEOUT, 'timeout waiting for pattern')
+            self._sock.settimeout(remaining)
+            try:
+                data = self._sock.recv(self.maxread)
+            except socket.timeout:
+                continue
+            except OSError:
+                data = b''
+            if not data:
+                self._eof = True
+            self._buffer += data.decode(errors='replace')
+
+    def _unmatched(self, patterns, exc, message):
+        self.before = self._buffer
+        self.after = exc
+        self._buffer = ''
+        if exc in patterns:
+            return patterns.index(exc)
+        raise exc(message)
+
+
+def spawn(command, maxread=65535, timeout=30, **kwargs):
+    return SpawnSocket(command, maxread=maxread, timeout=timeout)
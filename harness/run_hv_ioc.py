@@ -0,0 +1,28 @@
+# run_hv_ioc.py
+"""
+Run HV_IOCscript.py unchanged against fake_epics, with its sleeps divided
+by the speed factor. Started by soak.py with cwd set to the HV data
+directory:
+
+    python run_hv_ioc.py SPEED
+"""
+import os
+import runpy
+import sys
+import time
+
+import fake_epics
+
+HV_IOC_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'HV_IOCscript.py')
+
+
+def main():
+    speed = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    real_sleep = time.sleep
+    time.sleep = lambda seconds: real_sleep(seconds / speed)
+    sys.modules['epics'] = fake_epics
+    runpy.run_path(HV_IOC_SCRIPT, run_name='__main__')
+
+
+if __name__ == "__main__":
+    main()
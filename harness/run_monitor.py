@@ -0,0 +1,44 @@
+# run_monitor.py
+"""
+Run the curses UPS monitor, or its headless daemon, unchanged against
+fake_ups.py. Started by soak.py (the curses one on a pty) with cwd set to a
+scratch directory for the log files:
+
+    python run_monitor.py SPEED [headless]
+
+$HARNESS_UPS_ADDR tells fake_wexpect where the fake UPS listens.
+"""
+import os
+import sys
+
+import fake_wexpect
+
+CURSES_VERSION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'curses_version')
+
+
+def main():
+    speed = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    headless = sys.argv[2:3] == ['headless']
+    sys.modules['wexpect'] = fake_wexpect
+    sys.path.insert(0, CURSES_VERSION_DIR)
+
+    import config
+    config.POLLING_INTERVAL = max(1, int(config.POLLING_INTERVAL / speed))
+    config.POLLING_INTERVAL_FAST = max(1, int(config.POLLING_INTERVAL_FAST / speed))
+    config.POLLING_INTERVAL_SLOW = max(1, int(config.POLLING_INTERVAL_SLOW / speed))
+    config.SSH_CONNECT_DELAY = config.SSH_CONNECT_DELAY / speed
+    config.SSH_EXPECT_TIMEOUT = max(1, config.SSH_EXPECT_TIMEOUT / speed)
+    config.ERROR_RETRY_DELAY = config.ERROR_RETRY_DELAY / speed
+    config.DAEMON_FLUSH_INTERVAL = config.DAEMON_FLUSH_INTERVAL / speed
+    config.DAEMON_MAX_RECONNECT_DELAY = config.DAEMON_MAX_RECONNECT_DELAY / speed
+
+    if headless:
+        import ups_daemon
+        ups_daemon.main()
+    else:
+        import ups_monitor
+        ups_monitor.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,543 @@
+# soak.py
+"""
+End-to-end load and soak harness.
+
+Runs curses_version's UPS monitor (curses or headless daemon) against a
+fake UPS (fake_ups.py) and HV_IOCscript.py against a fake HV data writer
+and EPICS stand-in, both sped up by --speed, then reports throughput,
+latency percentiles, memory growth and lost records. Exits non-zero when
+a threshold is exceeded.
+
+    python harness/soak.py --speed 100 --duration 2h --ups-script outage \
+        --drop-rate 0.001 --report soak.json
+
+Pass --python to run the programs under test with the production
+interpreter rather than the one running the harness.
+"""
+import argparse
+import fcntl
+import glob
+import json
+import os
+import pty
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import termios
+import threading
+import time
+from collections import deque
+
+from fake_ups import FakeUPSServer
+from fake_hv_writer import FakeHVWriter
+from stats import MemoryTrack, Reservoir
+
+HARNESS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(1, os.path.join(HARNESS_DIR, '..', 'curses_version'))
+import config   # the monitor's own settings, unscaled
+
+HV_CURRENT_SET_PV = 'icarus_cathodehv_set/current'     # carries the row sequence number
+HV_POLLING_INTERVAL = 5                                # HV_IOCscript.POLLING_INTERVAL, seconds
+WATCHDOG_SEC = 90                                      # systemd WatchdogSec given to the daemon
+EXPECTS_WITHOUT_PING = 4                               # worst case, in create_ssh_session
+
+
+def parse_duration(text):
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    if text[-1:] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+class FileTail:
+    """Yields complete lines appended to a set of files since the last call."""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.offsets = {}
+        self.partial = {}
+
+    def read_lines(self):
+        for path in sorted(glob.glob(self.pattern)):
+            offset = self.offsets.get(path, 0)
+            try:
+                with open(path, 'rb') as f:
+                    f.seek(offset)
+                    data = f.read()
+            except OSError:
+                continue
+            if not data:
+                continue
+            self.offsets[path] = offset + len(data)
+            data = self.partial.pop(path, b'') + data
+            *lines, rest = data.split(b'\n')
+            if rest:
+                self.partial[path] = rest
+            for line in lines:
+                yield line.decode(errors='replace')
+
+
+class Target:
+    name = None
+
+    def __init__(self, args, workdir):
+        self.args = args
+        self.workdir = os.path.join(workdir, self.name)
+        os.makedirs(self.workdir, exist_ok=True)
+        self.proc = None
+        self.memory = None
+        self.exited_early = None
+
+    def check_alive(self):
+        if self.exited_early is None and self.proc.poll() is not None:
+            self.exited_early = self.proc.returncode
+
+    def terminate(self):
+        if self.proc.poll() is None:
+            self.proc.send_signal(signal.SIGTERM)
+            try:
+                self.proc.wait(5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+
+    def failures(self):
+        problems = []
+        if self.exited_early is not None:
+            problems.append(f'{self.name}: process exited early (status {self.exited_early})')
+        growth = self.memory.growth()
+        if growth is not None and growth > self.args.max_growth:
+            problems.append(f'{self.name}: RSS growing {growth:.0f} kB/h (limit {self.args.max_growth:.0f})')
+        return problems
+
+
+class MonitorTarget(Target):
+    name = 'monitor'
+
+    def start(self):
+        args = self.args
+        self.ups = FakeUPSServer(args.ups_script, latency=args.latency / 1000,
+                                 jitter=args.jitter / 1000, drop_rate=args.drop_rate)
+        host, port = self.ups.start()
+        self.proc = self.spawn(dict(os.environ, HARNESS_UPS_ADDR=f'{host}:{port}'))
+
+        self.memory = MemoryTrack(self.proc.pid, warmup=args.warmup)
+        self.tail = FileTail(os.path.join(self.workdir, self.log_pattern))
+        self.pending = deque()
+        self.last_sent = None
+        self.logged = 0
+        self.latency = Reservoir()
+        self.cycle = Reservoir()
+
+    log_pattern = 'upsstatus_v4_*.txt'
+
+    def spawn(self, env):
+        # curses needs a real terminal; give it a pty and throw the screen away
+        master, slave = pty.openpty()
+        fcntl.ioctl(slave, termios.TIOCSWINSZ, struct.pack('HHHH', 50, 250, 0, 0))
+        proc = subprocess.Popen(
+            [self.args.python, os.path.join(HARNESS_DIR, 'run_monitor.py'), str(self.args.speed)],
+            stdin=slave, stdout=slave, stderr=slave, cwd=self.workdir, env=dict(env, TERM='xterm'),
+            start_new_session=True)
+        os.close(slave)
+        self.master = master
+        self.screen_tail = deque(maxlen=64)
+        threading.Thread(target=self._drain, daemon=True).start()
+        os.write(master, b's')      # start monitoring
+        return proc
+
+    def count_samples(self, lines):
+        return sum(1 for _ in lines)
+
+    def _drain(self):
+        while True:
+            try:
+                data = os.read(self.master, 65536)
+            except OSError:
+                return
+            if not data:
+                return
+            self.screen_tail.append(data)
+
+    def poll(self):
+        # read the log first: every line seen then has its reply recorded
+        logged = self.count_samples(self.tail.read_lines())
+        now = time.monotonic()
+        for sent in self.ups.stats.take_sent_times():
+            if self.last_sent is not None:
+                self.cycle.add(sent - self.last_sent)
+            self.last_sent = sent
+            self.pending.append(sent)
+        for _ in range(logged):
+            self.logged += 1
+            if self.pending:
+                self.latency.add(now - self.pending.popleft())
+
+    def stop(self):
+        # let the replies already sent reach the log before shutting down
+        self.ups.hold()
+        deadline = time.monotonic() + 2.0
+        self.poll()
+        while self.pending and time.monotonic() < deadline:
+            time.sleep(0.002)
+            self.poll()
+        self.terminate()
+        self.ups.stop()
+        self.poll()
+        self.close()
+
+    def close(self):
+        os.close(self.master)
+
+    def report(self, elapsed):
+        stats = self.ups.stats
+        return {
+            "samples_served":     stats.served,
+            "samples_logged":     self.logged,
+            "lost_records":       max(0, stats.served - self.logged),
+            "connections":        stats.connections,
+            "dropped_injected":   stats.dropped,
+            "throughput_per_s":   self.logged / elapsed if elapsed else 0.0,
+            "reply_to_log_ms":    self.latency.summary(scale=1000),
+            "poll_cycle_ms":      self.cycle.summary(scale=1000),
+            "fast_cycle_ms":      config.POLLING_INTERVAL_FAST / self.args.speed,
+            "memory":             self.memory.summary(),
+            "exited_early":       self.exited_early,
+        }
+
+    def failures(self):
+        problems = super().failures()
+        lost = max(0, self.ups.stats.served - self.logged)
+        if lost > self.args.max_lost:
+            problems.append(f'{self.name}: {lost} served samples never logged (limit {self.args.max_lost})')
+        if self.exited_early is not None:
+            problems.append(f'{self.name}: last output:\n{self.last_output()[-2000:]}')
+        return problems
+
+    def last_output(self):
+        return b''.join(self.screen_tail).decode(errors='replace')
+
+
+class DaemonTarget(MonitorTarget):
+    """The headless monitor, supervised through a fake systemd notify socket."""
+    name = 'daemon'
+    log_pattern = 'upsstatus_v4_*.jsonl'
+
+    def spawn(self, env):
+        self.notify_path = os.path.join(self.workdir, 'notify.sock')
+        if os.path.exists(self.notify_path):
+            os.unlink(self.notify_path)
+        self.notify = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.notify.bind(self.notify_path)
+        self.notify.setblocking(False)
+        # run_monitor.py floors the scaled expect timeout at 1 s, so at high
+        # speeds the daemon may legitimately block longer than the scaled
+        # WatchdogSec; keep the watchdog above that worst case
+        expect_timeout = max(1, config.SSH_EXPECT_TIMEOUT / self.args.speed)
+        self.watchdog_usec = int(max(WATCHDOG_SEC / self.args.speed,
+                                     1.5 * EXPECTS_WITHOUT_PING * expect_timeout) * 1e6)
+        self.notifications = {}
+        self.last_ping = None
+        self.ping_gap = Reservoir()
+        self.stop_status = None
+        # as run_monitor.py scales it
+        self.slow_interval = max(1, int(config.POLLING_INTERVAL_SLOW / self.args.speed))
+        self.input_lost = False
+        self.outages = 0
+        self.outages_back_to_slow = 0
+        self.slow_since_outage = False
+
+        self.out = open(os.path.join(self.workdir, 'daemon.out'), 'w')
+        return subprocess.Popen(
+            [self.args.python, os.path.join(HARNESS_DIR, 'run_monitor.py'), str(self.args.speed), 'headless'],
+            stdout=self.out, stderr=subprocess.STDOUT, cwd=self.workdir,
+            env=dict(env, NOTIFY_SOCKET=self.notify_path, WATCHDOG_USEC=str(self.watchdog_usec)))
+
+    def count_samples(self, lines):
+        count = 0
+        for line in lines:
+            record = json.loads(line)
+            if record["event"] != "sample":
+                continue
+            count += 1
+            input_lost = float(record["voltage"]) < 1
+            if input_lost and not self.input_lost:
+                self.outages += 1
+                self.slow_since_outage = False
+            elif (self.outages and not self.slow_since_outage
+                    and record["polling_interval_ms"] == self.slow_interval):
+                self.outages_back_to_slow += 1
+                self.slow_since_outage = True
+            self.input_lost = input_lost
+        return count
+
+    def stop(self):
+        # buffered records only reach the log on the daemon's final flush, so
+        # stop it while it waits on the held UPS instead of draining first
+        self.ups.hold()
+        self.poll()
+        self.terminate()
+        self.ups.stop()
+        self.poll()
+        self.close()
+
+    def poll(self):
+        while True:
+            try:
+                state = self.notify.recv(4096).decode()
+            except BlockingIOError:
+                break
+            self.notifications[state] = self.notifications.get(state, 0) + 1
+            if state == 'WATCHDOG=1':
+                now = time.monotonic()
+                if self.last_ping is not None:
+                    self.ping_gap.add(now - self.last_ping)
+                self.last_ping = now
+        super().poll()
+
+    def terminate(self):
+        # the daemon is expected to exit by itself, and cleanly, on SIGTERM
+        if self.proc.poll() is None:
+            self.proc.send_signal(signal.SIGTERM)
+            try:
+                self.stop_status = self.proc.wait(5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+
+    def close(self):
+        self.poll()
+        self.notify.close()
+        self.out.close()
+
+    def last_output(self):
+        with open(os.path.join(self.workdir, 'daemon.out')) as f:
+            return f.read()
+
+    def report(self, elapsed):
+        report = super().report(elapsed)
+        report.update({
+            "notifications":      self.notifications,
+            "watchdog_gap_ms":    self.ping_gap.summary(scale=1000),
+            "watchdog_limit_ms":  self.watchdog_usec / 1000,
+            "outages":            self.outages,
+            "slow_after_outage":  self.outages_back_to_slow,
+            "sigterm_exit":       self.stop_status,
+        })
+        return report
+
+    def failures(self):
+        problems = super().failures()
+        if not self.notifications.get('READY=1'):
+            problems.append('daemon: never sent READY=1')
+        if self.ping_gap.max * 1e6 > self.watchdog_usec:
+            problems.append(f'daemon: watchdog starved for {self.ping_gap.max * 1000:.0f} ms')
+        # every outage leaves the alarm counter latched; polling must still calm down
+        if self.outages >= 2 and not self.outages_back_to_slow:
+            problems.append(f'daemon: polling never went back to {self.slow_interval} ms after {self.outages} outages')
+        if self.exited_early is None and self.stop_status != 0:
+            problems.append(f'daemon: no clean exit on SIGTERM (status {self.stop_status})')
+        return problems
+
+
+class HVTarget(Target):
+    name = 'hv'
+
+    def start(self):
+        args = self.args
+        self.datadir = os.path.join(self.workdir, 'data')
+        os.makedirs(self.datadir, exist_ok=True)
+        self.writer = FakeHVWriter(self.datadir, speed=args.speed, period=args.hv_period)
+        self.writer.write_row()     # the IOC script needs a row to start from
+        self.writer.start()
+
+        pv_log = os.path.join(self.workdir, 'pv.log')
+        env = dict(os.environ, HARNESS_PV_LOG=pv_log)
+        self.out = open(os.path.join(self.workdir, 'hv_ioc.out'), 'w')
+        self.proc = subprocess.Popen(
+            [args.python, os.path.join(HARNESS_DIR, 'run_hv_ioc.py'), str(args.speed)],
+            stdout=self.out, stderr=subprocess.STDOUT, cwd=self.datadir, env=env)
+
+        self.memory = MemoryTrack(self.proc.pid, warmup=args.warmup)
+        self.tail = FileTail(pv_log)
+        self.published = 0
+        self.superseded = 0
+        self.out_of_order = 0
+        self.last_seq = -1
+        self.latency = Reservoir()
+
+    def poll(self):
+        for line in self.tail.read_lines():
+            record = json.loads(line)
+            if record["pv"] != HV_CURRENT_SET_PV:
+                continue
+            seq = record["value"]
+            if seq <= self.last_seq:
+                self.out_of_order += 1
+                continue
+            with self.writer.lock:
+                written = self.writer.write_times.pop(seq, None)
+                # rows overtaken before the next IOC poll are never published
+                for old in [s for s in self.writer.write_times if s < seq]:
+                    del self.writer.write_times[old]
+                    self.superseded += 1
+            self.published += 1
+            self.last_seq = seq
+            if written is not None:
+                self.latency.add(record["t"] - written)
+
+    def stop(self):
+        self.writer.stop()
+        # give the IOC script a few of its polls to pick up the final row
+        deadline = time.monotonic() + 3 * HV_POLLING_INTERVAL / self.args.speed + 1
+        while time.monotonic() < deadline and self.last_seq < self.writer.seq - 1:
+            self.check_alive()
+            self.poll()
+            time.sleep(0.01)
+        self.terminate()
+        self.poll()
+        self.out.close()
+
+    def lost(self):
+        return max(0, self.writer.seq - 1 - max(self.last_seq, 0))
+
+    def report(self, elapsed):
+        return {
+            "rows_written":       self.writer.seq,
+            "files_written":      self.writer.files,
+            "rows_published":     self.published,
+            "rows_superseded":    self.superseded,
+            "out_of_order":       self.out_of_order,
+            "lost_records":       self.lost(),
+            "throughput_per_s":   self.published / elapsed if elapsed else 0.0,
+            "write_to_put_ms":    self.latency.summary(scale=1000),
+            "nominal_poll_ms":    HV_POLLING_INTERVAL * 1000 / self.args.speed,
+            "memory":             self.memory.summary(),
+            "exited_early":       self.exited_early,
+        }
+
+    def failures(self):
+        problems = super().failures()
+        if self.lost() > self.args.max_lost:
+            problems.append(f'hv: newest {self.lost()} rows never published (limit {self.args.max_lost})')
+        if self.out_of_order:
+            problems.append(f'hv: {self.out_of_order} stale or duplicate puts')
+        return problems
+
+
+TARGETS = {"monitor": MonitorTarget, "daemon": DaemonTarget, "hv": HVTarget}
+
+
+def format_report(report):
+    out = [f'soak run: {report["elapsed_s"]:.0f} s at {report["speed"]:g}x']
+    for name in TARGETS:
+        if name in report:
+            out.append(f'[{name}]')
+            for key, value in report[name].items():
+                if isinstance(value, dict):
+                    value = '  '.join(f'{k}={v:.3f}' if isinstance(v, float) else f'{k}={v}'
+                                      for k, v in value.items())
+                elif isinstance(value, float):
+                    value = f'{value:.3f}'
+                out.append(f'  {key:<18} {value}')
+    for problem in report["failures"]:
+        out.append(f'FAIL {problem}')
+    out.append('PASS' if not report["failures"] else 'FAILED')
+    return '\n'.join(out)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--targets', default='monitor,hv',
+                        help='comma separated subset of: monitor, daemon, hv (default: monitor,hv)')
+    parser.add_argument('--speed', type=float, default=100.0,
+                        help='time compression factor, e.g. 10 to 1000 (default: 100)')
+    parser.add_argument('--duration', type=parse_duration, default=60.0,
+                        help='real run time, e.g. 90, 30m, 4h (default: 60 s)')
+    parser.add_argument('--ups-script', default='outage',
+                        help='fake UPS readings: nominal, outage, brownout or a JSON file')
+    parser.add_argument('--latency', type=float, default=0.0, help='UPS reply latency in ms')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random UPS latency in ms')
+    parser.add_argument('--drop-rate', type=float, default=0.0,
+                        help='probability a detstatus reply has its connection dropped')
+    parser.add_argument('--hv-period', type=float, default=5.0,
+                        help='simulated seconds between HV data rows (default: 5)')
+    parser.add_argument('--warmup', type=float, default=30.0,
+                        help='real seconds ignored when fitting memory growth (default: 30)')
+    parser.add_argument('--max-lost', type=int, default=0, help='allowed lost records per target')
+    parser.add_argument('--max-growth', type=float, default=1024.0,
+                        help='allowed RSS growth in kB per hour (default: 1024)')
+    parser.add_argument('--progress', type=float, default=60.0,
+                        help='seconds between progress lines, 0 for none (default: 60)')
+    parser.add_argument('--workdir', help='keep logs and data here instead of a temp dir; must be new or empty')
+    parser.add_argument('--report', help='also write the report as JSON to this file')
+    parser.add_argument('--python', default=sys.executable,
+                        help='interpreter for the programs under test')
+    return parser.parse_args(argv)
+
+
+def run(args):
+    # logs left by an earlier run would be tailed and counted again
+    if args.workdir and os.path.isdir(args.workdir) and os.listdir(args.workdir):
+        sys.exit(f'soak: workdir {args.workdir} is not empty')
+    workdir = args.workdir or tempfile.mkdtemp(prefix='icarus_soak_')
+    targets = [TARGETS[name.strip()](args, workdir) for name in args.targets.split(',')]
+    print(f'soak: {", ".join(t.name for t in targets)} at {args.speed:g}x for {args.duration:.0f} s in {workdir}')
+
+    start = time.monotonic()
+    for target in targets:
+        target.start()
+
+    last_progress = start
+    next_memory = start
+    try:
+        while True:
+            now = time.monotonic()
+            elapsed = now - start
+            if elapsed >= args.duration:
+                break
+            for target in targets:
+                target.check_alive()
+                target.poll()
+            if now >= next_memory:
+                for target in targets:
+                    target.memory.sample(elapsed)
+                next_memory += 1.0
+            if args.progress and now - last_progress >= args.progress:
+                last_progress = now
+                print(f'  {elapsed:6.0f} s  ' + '  '.join(
+                    f'{t.name}: {t.report(elapsed)["throughput_per_s"]:.1f}/s' for t in targets))
+            if all(t.exited_early is not None for t in targets):
+                break
+            time.sleep(0.002)
+    except KeyboardInterrupt:
+        print('soak: interrupted, stopping targets')
+    finally:
+        elapsed = time.monotonic() - start
+        for target in targets:
+            target.check_alive()
+            target.stop()
+
+    report = {"speed": args.speed, "elapsed_s": elapsed, "workdir": workdir, "failures": []}
+    for target in targets:
+        report[target.name] = target.report(elapsed)
+        report["failures"].extend(target.failures())
+    return report
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    print(format_report(report))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
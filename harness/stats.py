@@ -0,0 +1,112 @@
+# stats.py
+import random
+
+
+class Reservoir:
+    """
+    Fixed-size uniform sample of a stream, so percentiles over an hours-long
+    soak run don't turn into a leak of their own.
+    """
+
+    def __init__(self, size=100000):
+        self.size = size
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        if len(self.samples) < self.size:
+            self.samples.append(value)
+        else:
+            i = random.randrange(self.count)
+            if i < self.size:
+                self.samples[i] = value
+
+    def percentile(self, p):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        k = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+        return ordered[k]
+
+    def summary(self, scale=1.0):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean":  self.total / self.count * scale,
+            "p50":   self.percentile(50) * scale,
+            "p90":   self.percentile(90) * scale,
+            "p99":   self.percentile(99) * scale,
+            "max":   self.max * scale,
+        }
+
+
+def read_rss_kb(pid):
+    """Resident set size of pid in kB, or None where /proc isn't available."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def slope(points):
+    """Least-squares slope of [(x, y), ...]; 0.0 with fewer than two points."""
+    n = len(points)
+    if n < 2:
+        return 0.0
+    mx = sum(x for x, _ in points) / n
+    my = sum(y for _, y in points) / n
+    sxx = sum((x - mx) ** 2 for x, _ in points)
+    if sxx == 0:
+        return 0.0
+    return sum((x - mx) * (y - my) for x, y in points) / sxx
+
+
+class MemoryTrack:
+    """
+    RSS samples of one process. Growth is fitted after the warm-up, and only
+    once there is at least min_span seconds of it; shorter fits are noise.
+    """
+
+    def __init__(self, pid, warmup=30.0, min_span=60.0):
+        self.pid = pid
+        self.warmup = warmup
+        self.min_span = min_span
+        self.first = None
+        self.last = None
+        self.peak = 0
+        self.points = []
+
+    def sample(self, elapsed):
+        rss = read_rss_kb(self.pid)
+        if rss is None:
+            return
+        self.last = rss
+        self.peak = max(self.peak, rss)
+        if elapsed >= self.warmup:
+            if self.first is None:
+                self.first = rss
+            self.points.append((elapsed, rss))
+
+    def growth(self):
+        """kB per hour, or None when the fitted window is too short."""
+        if not self.points or self.points[-1][0] - self.points[0][0] < self.min_span:
+            return None
+        return slope(self.points) * 3600
+
+    def summary(self):
+        return {
+            "rss_warm_kb":        self.first,
+            "rss_end_kb":         self.last,
+            "rss_peak_kb":        self.peak or None,
+            "growth_kb_per_hour": self.growth(),
+        }